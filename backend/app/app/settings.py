@@ -14,11 +14,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 
-<<<<<<< HEAD
 load_dotenv('../../.env')
-=======
-load_dotenv('.env')
->>>>>>> 779509a2631f805b20e387a7567cadc54624ff22
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,12 +51,16 @@ INSTALLED_APPS = [
     'room',
     'customer_detail',
     'time_extension',
+    'booking_audit',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PrimaryPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Below CorsMiddleware so 503s still carry CORS headers for the frontend
+    'core.middleware.LoadSheddingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -102,6 +102,39 @@ DATABASES = {
     }
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # SQLite ignores select_for_update, so take the write lock when the transaction starts
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 20}
+
+# Read replicas
+# Configure DB_REPLICA_1_NAME / _HOST / _PORT (then _2_, ...); unset values are taken from
+# the primary, so two SQLite files or two local PostgreSQL instances work for local testing
+
+DATABASE_REPLICAS = []
+replica_index = 1
+while os.environ.get(f'DB_REPLICA_{replica_index}_NAME') or os.environ.get(f'DB_REPLICA_{replica_index}_HOST'):
+    replica_alias = f'replica_{replica_index}'
+    DATABASES[replica_alias] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get(f'DB_REPLICA_{replica_index}_NAME', DATABASES['default']['NAME']),
+        'HOST': os.environ.get(f'DB_REPLICA_{replica_index}_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ.get(f'DB_REPLICA_{replica_index}_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES['default']['ENGINE'].startswith('django.db.backends.postgresql'):
+        # Fail fast on a dead replica host instead of blocking a request for the TCP timeout
+        DATABASES[replica_alias]['OPTIONS'] = {
+            **DATABASES['default'].get('OPTIONS', {}),
+            'connect_timeout': int(os.environ.get('REPLICA_CONNECT_TIMEOUT', 2)),
+        }
+    DATABASE_REPLICAS.append(replica_alias)
+    replica_index += 1
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter'] if DATABASE_REPLICAS else []
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 5))
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -121,9 +154,45 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Booking audit log
+# Append-only JSONL segments, flushed in batches by a background thread. In containers
+# BOOKING_AUDIT_DIR must be a volume, or the history is lost on every restart
+
+BOOKING_AUDIT_DIR = os.environ.get('BOOKING_AUDIT_DIR', os.path.join(BASE_DIR, 'audit'))
+BOOKING_AUDIT_BATCH_SIZE = int(os.environ.get('BOOKING_AUDIT_BATCH_SIZE', 100))
+BOOKING_AUDIT_FLUSH_INTERVAL = float(os.environ.get('BOOKING_AUDIT_FLUSH_INTERVAL', 2.0))
+BOOKING_AUDIT_SEGMENT_BYTES = int(os.environ.get('BOOKING_AUDIT_SEGMENT_BYTES', 16 * 1024 * 1024))
+BOOKING_AUDIT_MAX_BUFFER = int(os.environ.get('BOOKING_AUDIT_MAX_BUFFER', 100000))
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Throttles are attached per endpoint through throttle_classes, see core.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'search': os.environ.get('THROTTLE_SEARCH_RATE', '60/min'),
+        'book': os.environ.get('THROTTLE_BOOK_RATE', '30/min'),
+        'extend': os.environ.get('THROTTLE_EXTEND_RATE', '30/min'),
+    },
+    # Clients are identified by the address nginx puts in X-Forwarded-For, never by what they send.
+    # Only safe while the backend is reachable solely through nginx; set 0 when nothing proxies it
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
+}
+
+
+# Rate limiting and load shedding
+# THROTTLE_STORE is "memory" (per-process dict) or "cache" (CACHES['default'])
+
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'memory')
+# Each gunicorn worker runs GUNICORN_THREADS threads; by default the last free one is kept for writes
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+LOAD_SHEDDING_MAX_IN_FLIGHT = int(os.environ.get('LOAD_SHEDDING_MAX_IN_FLIGHT', max(GUNICORN_THREADS - 1, 1)))
+LOAD_SHEDDING_MAX_QUEUE_MS = int(os.environ.get('LOAD_SHEDDING_MAX_QUEUE_MS', 2000))
+LOAD_SHEDDING_EXEMPT_PATHS = ('/api/v1/metrics/',)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
 
 
@@ -143,4 +212,8 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = '/django_static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
\ No newline at end of file
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# prepare_boot records the hash of the last collected static files here, outside the
+# directory nginx serves
+COLLECTSTATIC_STAMP_FILE = os.environ.get('COLLECTSTATIC_STAMP_FILE', os.path.join(BASE_DIR, '.collectstatic.sha256'))
@@ -0,0 +1,5 @@
+from django.apps import AppConfig
+
+
+class BookingAuditConfig(AppConfig):
+    name = 'booking_audit'
@@ -0,0 +1,156 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = [
+    'room_code_id', 'start_time', 'end_time', 'status', 'total_price',
+    'booked_at', 'checked_in_at', 'checked_out_at', 'cancelled_at',
+]
+
+
+def booking_snapshot(booking, fields=None):
+    return {field: getattr(booking, field) for field in (fields or SNAPSHOT_FIELDS)}
+
+
+def actor_from_request(request):
+    if request is None:
+        return None
+    if request.user.is_authenticated:
+        return request.user.get_username()
+    # The API is anonymous, so fall back to the client address the throttles key on
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+class BookingAuditLog:
+    """
+    Append-only log of booking events stored as segmented JSONL files.
+
+    Events are queued once the surrounding transaction commits and written in
+    batches by a background thread, so requests never wait on the disk. A
+    failed write keeps its events buffered for the next flush; once the buffer
+    holds BOOKING_AUDIT_MAX_BUFFER events the oldest are dropped and logged.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._segment = None
+
+    @property
+    def directory(self):
+        return settings.BOOKING_AUDIT_DIR
+
+    def record(self, event, booking_id, changes, actor=None, **extra):
+        entry = {
+            'ts': timezone.now(),
+            'event': event,
+            'booking': booking_id,
+            'actor': actor,
+            'changes': changes,
+            **extra,
+        }
+        transaction.on_commit(lambda: self._enqueue(entry))
+
+    def _enqueue(self, entry):
+        with self._lock:
+            self._buffer.append(entry)
+            self._trim_buffer()
+            full = len(self._buffer) >= settings.BOOKING_AUDIT_BATCH_SIZE
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _trim_buffer(self):
+        # Caller holds self._lock
+        overflow = len(self._buffer) - settings.BOOKING_AUDIT_MAX_BUFFER
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.error('Booking audit buffer is full, dropped %d oldest events (%d in total)', overflow, self.dropped)
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each worker process starts its own flusher
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._segment = None
+                atexit.register(self._flush_quietly)
+            self._thread = threading.Thread(target=self._run, name='booking-audit-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.BOOKING_AUDIT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Could not write booking audit events to %s; keeping them for the next flush', self.directory)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return
+
+            try:
+                lines = ''.join(json.dumps(event, cls=DjangoJSONEncoder) + '\n' for event in events)
+                with open(self._segment_path(), 'a', encoding='utf-8') as segment:
+                    segment.write(lines)
+            except Exception:
+                # Put the batch back in front of anything queued meanwhile, oldest first
+                with self._lock:
+                    self._buffer = events + self._buffer
+                    self._trim_buffer()
+                raise
+
+    def _segment_path(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._segment is None:
+            self._segment = [os.getpid(), 0]
+        path = self._format_segment(*self._segment)
+        while os.path.exists(path) and os.path.getsize(path) >= settings.BOOKING_AUDIT_SEGMENT_BYTES:
+            self._segment[1] += 1
+            path = self._format_segment(*self._segment)
+        return path
+
+    def _format_segment(self, pid, index):
+        return os.path.join(self.directory, f'bookings-{pid}-{index:06d}.jsonl')
+
+    def read_events(self, directory=None):
+        events = []
+        for path in sorted(glob.glob(os.path.join(directory or self.directory, 'bookings-*.jsonl'))):
+            with open(path, encoding='utf-8') as segment:
+                events.extend(json.loads(line) for line in segment if line.strip())
+
+        # Segments are written per process, so merge them back into timestamp order
+        events.sort(key=lambda event: parse_datetime(event['ts']))
+        return events
+
+
+audit_log = BookingAuditLog()
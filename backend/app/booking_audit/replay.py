@@ -0,0 +1,27 @@
+from django.utils.dateparse import parse_datetime
+
+from booking_audit.log import audit_log
+
+
+def rebuild_bookings(at=None, booking_ids=None, events=None):
+    """
+    Rebuild booking state by replaying audit events up to and including `at`.
+    Returns a dict of booking id -> field values as they were at that moment.
+    """
+    if events is None:
+        events = audit_log.read_events()
+
+    bookings = {}
+    for event in events:
+        if at is not None and parse_datetime(event['ts']) > at:
+            break
+        if booking_ids and event['booking'] not in booking_ids:
+            continue
+
+        state = bookings.setdefault(event['booking'], {})
+        state.update(event['changes'])
+        state['last_event'] = event['event']
+        state['last_changed_at'] = event['ts']
+        state['last_changed_by'] = event['actor']
+
+    return bookings
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from booking_audit.log import audit_log
+from booking_audit.replay import rebuild_bookings
+from room.models import Room, RoomBooking
+
+
+class BookingAuditLogTests(APITestCase):
+    def setUp(self):
+        audit_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(audit_dir.cleanup)
+        settings_override = override_settings(BOOKING_AUDIT_DIR=audit_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.audit_dir = audit_dir.name
+        self.room = Room.objects.create(code='R101', capacity=2, price_per_hour=Decimal('100.00'))
+
+    def create_booking(self):
+        start_time = timezone.now() + timedelta(hours=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('room-booking-list-create'), {
+                'room_code': self.room.id,
+                'start_time': start_time.isoformat(),
+                'end_time': (start_time + timedelta(hours=2)).isoformat(),
+                'customer_details': [{'name': 'Juan', 'age': 30, 'gender': 'male'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return RoomBooking.objects.get(pk=response.data['id'])
+
+    def record(self, *booking_ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            for booking_id in booking_ids:
+                audit_log.record('created', booking_id, {'status': 'booked'})
+
+    def test_events_are_buffered_until_flush(self):
+        booking = self.create_booking()
+        self.assertEqual(audit_log.read_events(), [])
+
+        audit_log.flush()
+        events = audit_log.read_events()
+        self.assertEqual([event['event'] for event in events], ['created'])
+        self.assertEqual(events[0]['booking'], booking.id)
+        self.assertEqual(events[0]['actor'], 'ip:127.0.0.1')
+
+    def test_failed_flush_keeps_events_and_restarts_flusher(self):
+        # A path below a regular file can never be created
+        blocker = os.path.join(self.audit_dir, 'blocker')
+        open(blocker, 'w').close()
+
+        with override_settings(BOOKING_AUDIT_DIR=os.path.join(blocker, 'audit')):
+            self.record(1, 2)
+            with self.assertRaises(OSError):
+                audit_log.flush()
+
+        audit_log._thread = threading.Thread(target=lambda: None)
+        audit_log._thread.start()
+        audit_log._thread.join()
+        self.record(3)
+        self.assertTrue(audit_log._thread.is_alive())
+
+        audit_log.flush()
+        self.assertEqual([event['booking'] for event in audit_log.read_events()], [1, 2, 3])
+
+    @override_settings(BOOKING_AUDIT_MAX_BUFFER=2)
+    def test_buffer_drops_oldest_events_when_full(self):
+        dropped = audit_log.dropped
+        with self.assertLogs('booking_audit.log', 'ERROR'):
+            self.record(1, 2, 3)
+
+        audit_log.flush()
+        self.assertEqual([event['booking'] for event in audit_log.read_events()], [2, 3])
+        self.assertEqual(audit_log.dropped, dropped + 1)
+
+    def test_replay_rebuilds_state_at_point_in_time(self):
+        booking = self.create_booking()
+        audit_log.flush()
+        created_at = timezone.now()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('room-booking-update-view', args=[booking.id]), {'status': 'checked_in'}, format='json')
+            booking.refresh_from_db()
+            booking.extend_booking(1)
+        audit_log.flush()
+
+        state = rebuild_bookings(at=created_at)[booking.id]
+        self.assertEqual(state['status'], 'booked')
+        self.assertIsNone(state['checked_in_at'])
+        self.assertEqual(Decimal(state['total_price']), Decimal('200.00'))
+
+        state = rebuild_bookings()[booking.id]
+        self.assertEqual(state['status'], 'checked_in')
+        self.assertIsNotNone(state['checked_in_at'])
+        self.assertEqual(state['last_event'], 'extended')
+        self.assertEqual(Decimal(state['total_price']), Decimal('300.00'))
@@ -0,0 +1,133 @@
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from room.models import Room, RoomBooking
+from time_extension.models import TimeExtension
+
+
+class Command(BaseCommand):
+    help = 'Benchmark many concurrent booking extensions and resizes against the configured database'
+
+    MAX_RESIZE_HOURS = 3
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=10)
+        parser.add_argument('--extends', type=int, default=200, help='Total number of extensions')
+        parser.add_argument('--resizes', type=int, default=200, help='Total number of resizes of existing extensions')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark room and bookings')
+
+    def handle(self, *args, **options):
+        per_booking = math.ceil(options['extends'] / options['bookings'])
+        # Leave room for every extension of a booking plus a resize of up to MAX_RESIZE_HOURS
+        bookings = self.create_bookings(options['bookings'], spacing=per_booking + self.MAX_RESIZE_HOURS + 2)
+        booking_ids = [booking.id for booking in bookings]
+
+        def extend(index):
+            booking = RoomBooking.objects.get(pk=booking_ids[index % len(booking_ids)])
+            booking.extend_booking(1)
+
+        errors = self.run_concurrent('extends', extend, options['extends'], options['workers'])
+
+        # Every task resizes the first extension of its booking from a copy loaded
+        # before the lock, so concurrent resizes race on the same rows
+        extension_ids = [
+            TimeExtension.objects.filter(room_booking_id=booking_id).order_by('id').values_list('id', flat=True).first()
+            for booking_id in booking_ids
+        ]
+
+        def resize(index):
+            extension = TimeExtension.objects.select_related('room_booking').get(pk=extension_ids[index % len(extension_ids)])
+            extension.room_booking.resize_extension(extension, 1 + index % self.MAX_RESIZE_HOURS)
+
+        if all(extension_ids):
+            errors += self.run_concurrent('resizes', resize, options['resizes'], options['workers'])
+
+        inconsistent = self.check_consistency(bookings)
+
+        if not options['keep']:
+            TimeExtension.objects.filter(room_booking_id__in=booking_ids).delete()
+            RoomBooking.objects.filter(id__in=booking_ids).delete()
+            Room.objects.filter(pk=bookings[0].room_code_id).delete()
+
+        # Fail the run so the benchmark doubles as a concurrency check in scripts
+        if errors or inconsistent:
+            raise CommandError(f'{errors} operations failed, {len(inconsistent)} bookings inconsistent with their extensions')
+
+    def run_concurrent(self, label, operation, count, workers):
+        def timed(index):
+            try:
+                started_at = time.perf_counter()
+                operation(index)
+                return time.perf_counter() - started_at, None
+            except Exception as e:
+                return None, e
+            finally:
+                connection.close()
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(timed, range(count)))
+        elapsed = time.perf_counter() - started_at
+
+        latencies = sorted(latency for latency, _ in results if latency is not None)
+        errors = [error for _, error in results if error is not None]
+
+        self.stdout.write(f"{len(latencies)} {label} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f}/s), {len(errors)} errors")
+        if latencies:
+            self.stdout.write(
+                f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+                f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms "
+                f"max={latencies[-1] * 1000:.1f}ms"
+            )
+        for error in errors[:5]:
+            self.stdout.write(self.style.WARNING(f'error: {error}'))
+        return len(errors)
+
+    def create_bookings(self, count, spacing):
+        room = Room.objects.create(
+            code=f'BENCH-{int(time.time())}',
+            capacity=2,
+            price_per_hour=Decimal('100.00'),
+        )
+        start_time = timezone.now() + timedelta(days=365)
+        return [
+            RoomBooking.objects.create(
+                room_code=room,
+                start_time=start_time + timedelta(hours=i * spacing),
+                end_time=start_time + timedelta(hours=i * spacing + 1),
+                total_price=room.price_per_hour,
+            )
+            for i in range(count)
+        ]
+
+    def check_consistency(self, bookings):
+        inconsistent = []
+        for booking in bookings:
+            extensions = TimeExtension.objects.filter(room_booking=booking).aggregate(
+                hours=Sum('duration'), cost=Sum('additional_cost'),
+            )
+            stored = RoomBooking.objects.get(pk=booking.pk)
+            expected_end_time = booking.end_time + timedelta(hours=extensions['hours'] or 0)
+            expected_total = booking.total_price + (extensions['cost'] or 0)
+
+            if stored.end_time != expected_end_time or stored.total_price != expected_total:
+                inconsistent.append(booking.pk)
+                self.stdout.write(self.style.ERROR(
+                    f'Booking {booking.pk} is inconsistent with its extensions: '
+                    f'end_time {stored.end_time} (expected {expected_end_time}), '
+                    f'total_price {stored.total_price} (expected {expected_total})'
+                ))
+
+        if not inconsistent:
+            self.stdout.write(self.style.SUCCESS('All booking totals match their extensions'))
+        return inconsistent
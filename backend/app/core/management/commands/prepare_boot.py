@@ -0,0 +1,55 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import BaseCommand, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    help = 'Run migrate only when migrations are unapplied and collectstatic only when static files changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Run migrate and collectstatic unconditionally')
+
+    def handle(self, *args, **options):
+        self.migrate(options['force'])
+        self.collectstatic(options['force'])
+
+    def migrate(self, force):
+        # Ask the database itself, so a reset or fresh volume is always migrated
+        executor = MigrationExecutor(connection)
+        if not force and not executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            self.stdout.write('migrate: no unapplied migrations, skipped')
+            return
+
+        call_command('migrate', interactive=False, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('migrate: done'))
+
+    def collectstatic(self, force):
+        stamp_path = settings.COLLECTSTATIC_STAMP_FILE
+        digest = self.static_hash()
+        # The stamp is not in STATIC_ROOT, so also check a fresh static volume still gets filled
+        collected = os.path.isdir(settings.STATIC_ROOT) and any(os.scandir(settings.STATIC_ROOT))
+        if not force and collected and os.path.exists(stamp_path):
+            with open(stamp_path) as stamp:
+                if stamp.read() == digest:
+                    self.stdout.write('collectstatic: unchanged, skipped')
+                    return
+
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=self.stdout)
+        os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+        with open(stamp_path, 'w') as stamp:
+            stamp.write(digest)
+        self.stdout.write(self.style.SUCCESS('collectstatic: done'))
+
+    def static_hash(self):
+        entries = []
+        for finder in get_finders():
+            for path, storage in finder.list([]):
+                stat = os.stat(storage.path(path))
+                entries.append(f'{path}|{stat.st_size}|{stat.st_mtime_ns}')
+
+        return hashlib.sha256('\n'.join(sorted(entries)).encode()).hexdigest()
@@ -0,0 +1,72 @@
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Profile worker cold start: module import times, app ready() cost and time to first request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/v1/room/', help='Path served as the first request')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest modules to list')
+
+    def handle(self, *args, **options):
+        self.report('Cold boot', self.profile(options), options['top'])
+
+    def profile(self, options):
+        spawned_at = time.time()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'core.startup', options['path']],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        if not (probe['status'] or '').startswith('2'):
+            raise CommandError(
+                f"First request to {options['path']} returned {probe['status']}; "
+                f"timings are only meaningful for a successful request (is the database migrated?)"
+            )
+        probe['time_to_first_request'] = probe['finished_at'] - spawned_at
+        probe['imports'] = self.parse_importtime(result.stderr)
+        return probe
+
+    def parse_importtime(self, output):
+        imports = []
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+            imports.append((name.strip(), int(self_us), int(cumulative_us)))
+        return imports
+
+    def report(self, title, probe, top):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}'))
+        self.stdout.write(
+            f"django.setup + wsgi: {probe['setup'] * 1000:.0f}ms, "
+            f"first request ({probe['status']}): {probe['first_request'] * 1000:.0f}ms, "
+            f"process start to response: {probe['time_to_first_request'] * 1000:.0f}ms, "
+            f"{probe['modules']} modules loaded"
+        )
+
+        packages = defaultdict(int)
+        for name, self_us, _ in probe['imports']:
+            packages[name.split('.')[0]] += self_us
+
+        self.stdout.write('\nImport time by package (self):')
+        for package, total_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {total_us / 1000:8.1f}ms  {package}')
+
+        self.stdout.write('\nSlowest modules (self / cumulative):')
+        for name, self_us, cumulative_us in sorted(probe['imports'], key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {self_us / 1000:8.1f}ms {cumulative_us / 1000:8.1f}ms  {name}')
+
+        self.stdout.write('\nApp loading:')
+        for key, seconds in sorted(probe['apps'].items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {seconds * 1000:8.1f}ms  {key}')
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from booking_audit.log import audit_log
+from booking_audit.replay import rebuild_bookings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild booking state from the audit log at a point in time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help='ISO datetime to replay up to (defaults to now)')
+        parser.add_argument('--booking', type=int, action='append', dest='bookings', help='Booking id, repeatable')
+        parser.add_argument('--dir', help='Audit log directory (defaults to BOOKING_AUDIT_DIR)')
+
+    def handle(self, *args, **options):
+        at = None
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError(f"Invalid datetime: {options['at']}")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        events = audit_log.read_events(options['dir'])
+        bookings = rebuild_bookings(at=at, booking_ids=options['bookings'], events=events)
+
+        self.stdout.write(json.dumps(bookings, cls=DjangoJSONEncoder, indent=2))
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from core.routers import has_written_to_primary, primary_pinning, replicas_failed
+from core.throttling import metrics
+
+
+class LoadSheddingMiddleware:
+    """
+    Reject low-priority API reads with 503 while the worker is overloaded, so
+    booking writes keep getting served during search floods.
+
+    A worker counts as overloaded when its threads are nearly all busy
+    (LOAD_SHEDDING_MAX_IN_FLIGHT follows GUNICORN_THREADS), or when the proxy
+    reports the request sat in the queue too long (nginx sets X-Request-Start
+    to "t=<epoch seconds>").
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def __call__(self, request):
+        if self.is_low_priority(request):
+            reason = self.overload_reason(request)
+            if reason:
+                metrics.incr(f'shed.{reason}')
+                return JsonResponse(
+                    {'detail': 'The server is busy, please retry shortly.'},
+                    status=503,
+                    headers={'Retry-After': '1'},
+                )
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self.get_response(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def is_low_priority(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and request.path.startswith('/api/')
+            and not request.path.startswith(settings.LOAD_SHEDDING_EXEMPT_PATHS)
+        )
+
+    def overload_reason(self, request):
+        if self.in_flight >= settings.LOAD_SHEDDING_MAX_IN_FLIGHT:
+            return 'in_flight'
+
+        request_start = request.headers.get('X-Request-Start', '')
+        try:
+            started_at = float(request_start.removeprefix('t='))
+        except ValueError:
+            return None
+        if (time.time() - started_at) * 1000 > settings.LOAD_SHEDDING_MAX_QUEUE_MS:
+            return 'queue_time'
+        return None
+
+
+class PrimaryPinningMiddleware:
+    """
+    Keep a client's reads on the primary for REPLICA_PIN_SECONDS after it
+    writes, so it never reads its own changes from a lagging replica.
+
+    A safe request that fails because a replica went down after its last
+    health check is marked unhealthy and its view is run again on the primary.
+    Only the view is retried, so the request is not throttled or shed twice.
+    """
+
+    COOKIE_NAME = 'pin_primary'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or self.COOKIE_NAME in request.COOKIES
+        with primary_pinning(pinned):
+            response = self.get_response(request)
+            if has_written_to_primary():
+                response.set_cookie(
+                    self.COOKIE_NAME, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+                )
+        return response
+
+    def process_exception(self, request, exception):
+        if getattr(request, 'replica_retry', False) or request.method not in SAFE_METHODS:
+            return None
+        if not isinstance(exception, DatabaseError) or not replicas_failed():
+            return None
+
+        # Throttles see this flag and do not take a second token for the same request
+        request.replica_retry = True
+        match = request.resolver_match
+        with primary_pinning(True):
+            return match.func(request, *match.args, **match.kwargs)
@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+# None outside primary_pinning(), which keeps management commands and shells on the primary
+_replicas_used = ContextVar('replicas_used', default=None)
+
+# Replicas in recovery report how far behind the primary they are; an idle
+# replica that has replayed everything it received is not lagging at all
+POSTGRES_LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@contextmanager
+def primary_pinning(pinned):
+    """Scope read routing to one request; `pinned` forces its reads to the primary."""
+    pinned_token = _pinned_to_primary.set(pinned)
+    wrote_token = _wrote_to_primary.set(False)
+    used_token = _replicas_used.set(set())
+    try:
+        yield
+    finally:
+        _replicas_used.reset(used_token)
+        _wrote_to_primary.reset(wrote_token)
+        _pinned_to_primary.reset(pinned_token)
+
+
+def has_written_to_primary():
+    return _wrote_to_primary.get()
+
+
+def is_pinned_to_primary():
+    return _replicas_used.get() is None or _pinned_to_primary.get() or _wrote_to_primary.get()
+
+
+def replicas_failed():
+    """Re-check the replicas this request read from; True if any of them is now unhealthy."""
+    return not all(replica_health.recheck(alias) for alias in _replicas_used.get() or ())
+
+
+class ReplicaHealth:
+    """Caches per-process replica health for REPLICA_HEALTH_CHECK_INTERVAL seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        with self._lock:
+            cached = self._checked.get(alias)
+        if cached and time.monotonic() - cached[1] < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return cached[0]
+
+        return self.recheck(alias)
+
+    def recheck(self, alias):
+        healthy = self.check(alias)
+        with self._lock:
+            self._checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(POSTGRES_LAG_QUERY)
+                    return float(cursor.fetchone()[0]) <= settings.REPLICA_MAX_LAG_SECONDS
+                # Also catches an empty SQLite file, which connecting would silently create
+                cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+            return True
+        except DatabaseError:
+            connection.close()
+            return False
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to a healthy replica from DATABASE_REPLICAS and everything else
+    to the primary. Only requests scoped by PrimaryPinningMiddleware read from
+    replicas; reads stay on the primary outside a request, inside transactions,
+    after a write in the same request, and while the client carries the pin
+    cookie set by the middleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_pinned_to_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if replica_health.is_healthy(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+
+        alias = random.choice(replicas)
+        _replicas_used.get().add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,66 @@
+"""
+Cold start probe used by the profile_startup command.
+
+Run as `python -X importtime -m core.startup <path>` from the project root. It
+boots the project through app.wsgi like a gunicorn worker, serves one GET
+request and prints per-app timings as JSON on stdout.
+"""
+import json
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+
+def timed(timings, key, func):
+    def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[key] = timings.get(key, 0) + time.perf_counter() - started_at
+    return wrapper
+
+
+def instrument_app_configs(timings):
+    from django.apps.config import AppConfig
+
+    create = AppConfig.create.__func__
+
+    def create_timed(cls, entry):
+        app_config = create(cls, entry)
+        app_config.import_models = timed(timings, f'{app_config.label}.import_models', app_config.import_models)
+        app_config.ready = timed(timings, f'{app_config.label}.ready', app_config.ready)
+        return app_config
+
+    AppConfig.create = classmethod(create_timed)
+
+
+def main(path):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    timings = {}
+    instrument_app_configs(timings)
+
+    started_at = time.perf_counter()
+    from app.wsgi import application
+    setup_time = time.perf_counter() - started_at
+
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    response_status = []
+    response = application(environ, lambda status, headers: response_status.append(status))
+    b''.join(response)
+    first_request_time = time.perf_counter() - started_at
+
+    print(json.dumps({
+        'finished_at': time.time(),
+        'setup': setup_time,
+        'first_request': first_request_time,
+        'status': response_status[0] if response_status else None,
+        'apps': timings,
+        'modules': len(sys.modules),
+    }))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else '/api/v1/room/')
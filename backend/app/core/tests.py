@@ -0,0 +1,267 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connections
+from django.db.utils import load_backend
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from core.middleware import LoadSheddingMiddleware, PrimaryPinningMiddleware
+from core.routers import PrimaryReplicaRouter, ReplicaHealth, primary_pinning, replica_health
+from core.throttling import get_bucket_store, metrics
+from room.models import Room
+
+THROTTLED_REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'search': '2/min', 'book': '2/min', 'extend': '2/min'},
+}
+
+
+@override_settings(REST_FRAMEWORK=THROTTLED_REST_FRAMEWORK)
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        metrics.reset()
+        self.url = reverse('room-list-create')
+
+    def create_room(self, code):
+        return self.client.post(self.url, {'code': code, 'capacity': 2, 'price_per_hour': '100.00'}, format='json')
+
+    def test_search_is_throttled_per_client(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response.headers)
+
+        response = self.client.get(self.url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(self):
+        # nginx appends the real client address after whatever the client sent
+        responses = [
+            self.client.get(self.url, HTTP_X_FORWARDED_FOR=f'10.9.9.{i}, 203.0.113.5')
+            for i in range(3)
+        ]
+
+        self.assertEqual(responses[1].status_code, status.HTTP_200_OK)
+        self.assertEqual(responses[2].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_buckets_are_per_endpoint(self):
+        for _ in range(3):
+            self.client.get(self.url)
+
+        # Other reads and writes do not share the search bucket
+        self.assertEqual(self.create_room('R101').status_code, status.HTTP_201_CREATED)
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('room-booking-list-create')).status_code, status.HTTP_200_OK)
+
+    def test_bookings_have_their_own_bucket(self):
+        for _ in range(3):
+            self.client.get(self.url)
+
+        booking_url = reverse('room-booking-list-create')
+        self.assertEqual(self.client.post(booking_url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(booking_url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(booking_url, {}, format='json').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_metrics_report_throttle_counters(self):
+        for _ in range(3):
+            self.client.get(self.url)
+
+        response = self.client.get(reverse('throttle-metrics'))
+        self.assertEqual(response.data['counters']['throttle.search.allowed'], 2)
+        self.assertEqual(response.data['counters']['throttle.search.throttled'], 1)
+
+
+class LoadSheddingTests(APITestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.url = reverse('room-list-create')
+        self.queued_since = f't={time.time() - 10:.3f}'
+
+    def test_reads_are_shed_when_queue_time_is_exceeded(self):
+        response = self.client.get(self.url, HTTP_X_REQUEST_START=self.queued_since)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response = self.client.get(self.url, HTTP_X_REQUEST_START=f't={time.time():.3f}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(LOAD_SHEDDING_MAX_IN_FLIGHT=3)
+    def test_reads_are_shed_when_threads_are_busy(self):
+        middleware = LoadSheddingMiddleware(lambda request: HttpResponse())
+        middleware.in_flight = 3
+        factory = RequestFactory()
+
+        self.assertEqual(middleware(factory.get(self.url)).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(middleware(factory.post(self.url)).status_code, status.HTTP_200_OK)
+
+    @override_settings(CORS_ALLOWED_ORIGINS=['http://localhost:3000'])
+    def test_shed_responses_carry_cors_headers(self):
+        response = self.client.get(self.url, HTTP_X_REQUEST_START=self.queued_since, HTTP_ORIGIN='http://localhost:3000')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.headers['Access-Control-Allow-Origin'], 'http://localhost:3000')
+
+    def test_writes_are_never_shed(self):
+        response = self.client.post(
+            self.url, {'code': 'R101', 'capacity': 2, 'price_per_hour': '100.00'},
+            format='json', HTTP_X_REQUEST_START=self.queued_since,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class PrepareBootTests(TestCase):
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        stamp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(stamp_dir.cleanup)
+        self.static_root = static_root.name
+        settings_override = override_settings(
+            STATIC_ROOT=static_root.name,
+            COLLECTSTATIC_STAMP_FILE=os.path.join(stamp_dir.name, '.collectstatic.sha256'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def prepare_boot(self, *args):
+        out = StringIO()
+        call_command('prepare_boot', *args, stdout=out)
+        return out.getvalue()
+
+    def test_steps_are_skipped_when_nothing_changed(self):
+        self.assertIn('collectstatic: done', self.prepare_boot())
+
+        output = self.prepare_boot()
+        self.assertIn('migrate: no unapplied migrations, skipped', output)
+        self.assertIn('collectstatic: unchanged, skipped', output)
+
+        self.assertIn('collectstatic: done', self.prepare_boot('--force'))
+        self.assertFalse(any(entry.name.endswith('.sha256') for entry in os.scandir(self.static_root)))
+
+    def test_collectstatic_runs_on_empty_static_root(self):
+        self.prepare_boot()
+        shutil.rmtree(self.static_root)
+
+        self.assertIn('collectstatic: done', self.prepare_boot())
+
+    def test_migrate_runs_when_database_has_unapplied_migrations(self):
+        with mock.patch('core.management.commands.prepare_boot.MigrationExecutor.migration_plan', return_value=['pending']), \
+                mock.patch('core.management.commands.prepare_boot.call_command') as run_command:
+            output = self.prepare_boot()
+
+        self.assertIn('migrate: done', output)
+        run_command.assert_any_call('migrate', interactive=False, stdout=mock.ANY)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch.object(replica_health, 'check', return_value=True)
+        self.check = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(replica_health.reset)
+
+    def test_reads_go_to_replicas(self):
+        with primary_pinning(False):
+            self.assertIn(self.router.db_for_read(Room), ['replica_1', 'replica_2'])
+            self.assertEqual(self.router.db_for_write(Room), 'default')
+
+    def test_reads_after_write_stay_on_primary(self):
+        with primary_pinning(False):
+            self.router.db_for_write(Room)
+            self.assertEqual(self.router.db_for_read(Room), 'default')
+
+        with primary_pinning(False):
+            self.assertNotEqual(self.router.db_for_read(Room), 'default')
+
+    def test_unhealthy_replicas_fall_back_to_primary(self):
+        self.check.side_effect = lambda alias: alias == 'replica_2'
+        with primary_pinning(False):
+            self.assertEqual(self.router.db_for_read(Room), 'replica_2')
+
+        replica_health.reset()
+        self.check.side_effect = None
+        self.check.return_value = False
+        with primary_pinning(False):
+            self.assertEqual(self.router.db_for_read(Room), 'default')
+
+    def test_migrations_only_run_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'room'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'room'))
+
+    def test_middleware_pins_client_after_write(self):
+        routed = []
+
+        def get_response(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Room)
+            routed.append(self.router.db_for_read(Room))
+            return HttpResponse()
+
+        middleware = PrimaryPinningMiddleware(get_response)
+        factory = RequestFactory()
+
+        response = middleware(factory.post('/api/v1/room/'))
+        self.assertIn(PrimaryPinningMiddleware.COOKIE_NAME, response.cookies)
+
+        pinned_request = factory.get('/api/v1/room/')
+        pinned_request.COOKIES[PrimaryPinningMiddleware.COOKIE_NAME] = '1'
+        response = middleware(pinned_request)
+        self.assertNotIn(PrimaryPinningMiddleware.COOKIE_NAME, response.cookies)
+
+        middleware(factory.get('/api/v1/room/'))
+        self.assertEqual(routed[:2], ['default', 'default'])
+        self.assertNotEqual(routed[2], 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_missing'], DATABASE_ROUTERS=['core.routers.PrimaryReplicaRouter'])
+class ReplicaFailoverTests(TransactionTestCase):
+    def setUp(self):
+        # A replica whose SQLite file cannot exist, so every connection attempt fails
+        settings_dict = {**connections['default'].settings_dict, 'NAME': '/nonexistent-dir/replica.sqlite3'}
+        connections['replica_missing'] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'replica_missing')
+        self.addCleanup(self.remove_replica)
+        self.addCleanup(replica_health.reset)
+        get_bucket_store().clear()
+
+    def remove_replica(self):
+        connections['replica_missing'].close()
+        del connections['replica_missing']
+
+    def test_missing_replica_fails_health_check(self):
+        self.assertFalse(ReplicaHealth().check('replica_missing'))
+
+    def test_read_is_retried_on_primary_when_replica_fails(self):
+        Room.objects.create(code='R101', capacity=2, price_per_hour='100.00')
+
+        metrics.reset()
+
+        # The replica passed its last health check and then went away
+        with mock.patch.object(replica_health, 'check', side_effect=[True, False]), \
+                self.assertNoLogs('django.request', 'ERROR'):
+            client = APIClient(raise_request_exception=False)
+            response = client.get(reverse('room-list-create'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertFalse(replica_health.is_healthy('replica_missing'))
+        # The retry did not take a second throttle token
+        self.assertEqual(metrics.snapshot()['counters'], {'throttle.search.allowed': 1})
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        with mock.patch.object(replica_health, 'check', return_value=True):
+            self.assertEqual(Room.objects.count(), 0)
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Room), 'default')
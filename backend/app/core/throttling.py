@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class ThrottleMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {'pid': os.getpid(), 'counters': counters}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = ThrottleMetrics()
+
+
+class MemoryBucketStore:
+    """Per-process token buckets kept in a dict, so a check never leaves the process."""
+
+    MAX_KEYS = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, capacity, refill_rate, now):
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self._buckets) >= self.MAX_KEYS and key not in self._buckets:
+                self._prune(now)
+            self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def _prune(self, now):
+        # Drop buckets that have been idle for a minute; they would be full again anyway
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < 60
+        }
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets kept in a Django cache backend, e.g. the local-memory cache."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def take(self, key, capacity, refill_rate, now):
+        cache = caches[self.alias]
+        tokens, updated_at = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        return allowed, tokens
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_stores = {'memory': MemoryBucketStore(), 'cache': CacheBucketStore()}
+
+
+def get_bucket_store():
+    return _stores[settings.THROTTLE_STORE]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client and scope. A rate of "30/min" allows bursts of 30
+    requests and refills one token every two seconds.
+
+    Subclasses are attached to the endpoints they protect through the view's
+    throttle_classes; `methods` limits which requests to that view take a token.
+    """
+
+    scope = None
+    methods = None
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        capacity = int(num)
+        return capacity, capacity / PERIODS[period[0]]
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        # PrimaryPinningMiddleware re-runs a view whose replica failed; it was already counted
+        if getattr(request, 'replica_retry', False):
+            return True
+
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+
+        capacity, self.refill_rate = self.parse_rate(rate)
+        allowed, self.tokens = get_bucket_store().take(
+            self.get_cache_key(request, view), capacity, self.refill_rate, time.time(),
+        )
+
+        metrics.incr(f'throttle.{self.scope}.{"allowed" if allowed else "throttled"}')
+        return allowed
+
+    def wait(self):
+        return (1 - self.tokens) / self.refill_rate
+
+
+class SearchThrottle(TokenBucketThrottle):
+    """Room listing and availability search."""
+    scope = 'search'
+    methods = SAFE_METHODS
+
+
+class BookThrottle(TokenBucketThrottle):
+    """New bookings and batched status changes."""
+    scope = 'book'
+    methods = UNSAFE_METHODS
+
+
+class ExtendThrottle(TokenBucketThrottle):
+    """Adding and resizing time extensions."""
+    scope = 'extend'
+    methods = UNSAFE_METHODS
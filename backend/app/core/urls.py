@@ -0,0 +1,7 @@
+from django.urls import path
+
+from core.views import ThrottleMetricsView
+
+urlpatterns = [
+    path('throttle/', ThrottleMetricsView.as_view(), name='throttle-metrics'),
+]
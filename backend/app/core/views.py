@@ -0,0 +1,11 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.throttling import metrics
+
+
+class ThrottleMetricsView(APIView):
+    throttle_classes = []
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.snapshot())
@@ -1,10 +1,13 @@
 from datetime import timedelta
 from decimal import Decimal
 
-from django.db import models
-from django.db.models import JSONField, Sum
+from django.db import models, transaction
+from django.db.models import F, JSONField, Sum
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from booking_audit.log import audit_log, booking_snapshot
+
 
 def bed_details_validator(value):
     allowed_types = ['single', 'double', 'queen', 'king']
@@ -39,6 +42,15 @@ class RoomBooking(models.Model):
         ('checked_out', 'Checked Out'),
         ('cancelled', 'Cancelled'),
     ]
+    CANCELLABLE_STATUSES = ['booked']
+    EXTENDABLE_STATUSES = ['booked', 'checked_in']
+    # Bookings in these statuses hold their room for their time range
+    ACTIVE_STATUSES = ['booked', 'checked_in']
+    STATUS_TIMESTAMP_FIELDS = {
+        'checked_in': 'checked_in_at',
+        'checked_out': 'checked_out_at',
+        'cancelled': 'cancelled_at',
+    }
 
     room_code = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, related_name='bookings')
     start_time = models.DateTimeField()
@@ -50,6 +62,12 @@ class RoomBooking(models.Model):
     checked_out_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Covers the overlap check in is_available and the availability search
+            models.Index(fields=['room_code', 'start_time', 'end_time']),
+        ]
+
     def __str__(self):
         if self.room_code:
             return f"Booking {self.room_code.code} ({self.id}) - {self.status}"
@@ -68,27 +86,77 @@ class RoomBooking(models.Model):
         self.total_price = round(total_hours * hourly_rate, 2)
         self.save()
 
-    def extend_booking(self, minutes):
-        hours_added = Decimal(minutes) / Decimal(60)
-        extension_cost = round(hours_added * self.room_code.price_per_hour, 2)
+    @transaction.atomic
+    def extend_booking(self, hours, actor=None):
+        # TimeExtension.duration is whole hours, so extensions are too
+        if isinstance(hours, bool) or not isinstance(hours, int) or hours < 1:
+            raise ValidationError({'duration': 'Extensions must be a whole number of hours.'})
+
+        extension_cost = self._shift_end_time(hours * 60, actor)
 
         from time_extension.models import TimeExtension # Avoid circular import
-        time_extension = TimeExtension.objects.create(
+        return TimeExtension.objects.create(
             room_booking=self,
-            duration=hours_added,
+            duration=hours,
             additional_cost=extension_cost,
         )
 
-        self.end_time += timedelta(minutes=minutes)
-        self.total_price += extension_cost
-        self.save()
+    @transaction.atomic
+    def resize_extension(self, time_extension, hours, actor=None):
+        # Lock the booking, then re-read the extension under lock, so concurrent
+        # resizes work from the latest duration instead of the one the view loaded
+        RoomBooking.objects.select_for_update().get(pk=self.pk)
+
+        from time_extension.models import TimeExtension # Avoid circular import
+        time_extension = TimeExtension.objects.select_for_update().get(pk=time_extension.pk)
 
+        minutes = (hours - time_extension.duration) * 60
+        if minutes:
+            extension_cost = self._shift_end_time(minutes, actor)
+            time_extension.additional_cost += extension_cost
+        time_extension.duration = hours
+        time_extension.save(update_fields=['duration', 'additional_cost'])
         return time_extension
 
+    def _shift_end_time(self, minutes, actor):
+        # Lock the booking, then its room, so concurrent extends of any booking
+        # in the same room see each other's new end times
+        booking = RoomBooking.objects.select_for_update().get(pk=self.pk)
+        room = Room.objects.select_for_update().get(pk=booking.room_code_id)
+        booking.room_code = room
+
+        if booking.status not in self.EXTENDABLE_STATUSES:
+            raise ValidationError({'status': f'Cannot extend a booking that is already {booking.status}'})
+
+        new_end_time = booking.end_time + timedelta(minutes=minutes)
+        if new_end_time <= booking.start_time:
+            raise ValidationError({'duration': 'The booking must end after it starts.'})
+        if minutes > 0 and not booking.is_available(booking.end_time, new_end_time):
+            raise ValidationError({'error': 'The room is not available for the extended time range.'})
+
+        hours_added = Decimal(minutes) / Decimal(60)
+        extension_cost = round(hours_added * room.price_per_hour, 2)
+
+        RoomBooking.objects.filter(pk=self.pk).update(
+            end_time=F('end_time') + timedelta(minutes=minutes),
+            total_price=F('total_price') + extension_cost,
+        )
+
+        self.room_code = room
+        self.end_time = new_end_time
+        self.total_price = booking.total_price + extension_cost
+
+        audit_log.record(
+            'extended', self.id, booking_snapshot(self, ['end_time', 'total_price']),
+            actor=actor, minutes=minutes,
+        )
+
+        return extension_cost
+
     def is_available(self, start_time, end_time):
         overlapping_bookings = RoomBooking.objects.filter(
             room_code=self.room_code,
-            status__in=['booked', 'checked_in'],
+            status__in=self.ACTIVE_STATUSES,
             start_time__lt=end_time,
             end_time__gt=start_time
         )
@@ -99,7 +167,104 @@ class RoomBooking(models.Model):
         return not overlapping_bookings.exists()
 
     def can_cancel(self):
-        return self.status == 'booked'
+        return self.status in self.CANCELLABLE_STATUSES
+
+    @classmethod
+    def allowed_source_statuses(cls, new_status):
+        # Same rules as RoomBookingUpdateSerializer: only cancellation is restricted
+        if new_status == 'cancelled':
+            return list(cls.CANCELLABLE_STATUSES)
+        return [status for status, _ in cls.ROOM_BOOKING_STATUS_CHOICES if status != new_status]
+
+    @classmethod
+    @transaction.atomic
+    def bulk_transition(cls, ids, new_status, actor=None):
+        ids = list(dict.fromkeys(ids))
+
+        # Lock the rows in id order so concurrent batches cannot interleave or deadlock
+        bookings = {
+            booking.id: booking
+            for booking in cls.objects.select_for_update().filter(id__in=ids).order_by('id')
+        }
+
+        allowed_statuses = cls.allowed_source_statuses(new_status)
+        unavailable = cls.unavailable_for_reactivation([
+            booking for booking in bookings.values()
+            if new_status in cls.ACTIVE_STATUSES
+            and booking.status not in cls.ACTIVE_STATUSES
+            and booking.status in allowed_statuses
+        ])
+
+        changes = {'status': new_status}
+        timestamp_field = cls.STATUS_TIMESTAMP_FIELDS.get(new_status)
+        if timestamp_field:
+            changes[timestamp_field] = timezone.now()
+
+        results = []
+        updated_ids = []
+        for booking_id in ids:
+            booking = bookings.get(booking_id)
+            if booking is None:
+                results.append({'id': booking_id, 'result': 'not_found'})
+            elif booking.status == new_status:
+                results.append({'id': booking_id, 'result': 'unchanged', 'status': booking.status})
+            elif booking.status not in allowed_statuses:
+                results.append({
+                    'id': booking_id,
+                    'result': 'invalid_transition',
+                    'status': booking.status,
+                    'error': f'Cannot change a booking from "{booking.status}" to "{new_status}".',
+                })
+            elif booking_id in unavailable:
+                results.append({
+                    'id': booking_id,
+                    'result': 'unavailable',
+                    'status': booking.status,
+                    'error': 'The room is no longer available for this booking\'s time range.',
+                })
+            else:
+                updated_ids.append(booking_id)
+                results.append({'id': booking_id, 'result': 'updated', 'status': new_status})
+                audit_log.record('status_changed', booking_id, changes, actor=actor, from_status=booking.status)
+
+        cls.objects.filter(id__in=updated_ids).update(**changes)
+
+        return results
+
+    @classmethod
+    def unavailable_for_reactivation(cls, bookings):
+        """
+        Ids of cancelled or checked-out bookings whose time range is now taken,
+        either by an active booking or by another booking reactivated before it.
+        """
+        if not bookings:
+            return set()
+
+        # Same room lock as new bookings and extensions, so nothing claims a window
+        # between this check and the update
+        room_ids = {booking.room_code_id for booking in bookings if booking.room_code_id is not None}
+        list(Room.objects.select_for_update().filter(id__in=room_ids).order_by('id'))
+
+        claimed = list(
+            cls.objects.filter(
+                room_code_id__in=room_ids,
+                status__in=cls.ACTIVE_STATUSES,
+                start_time__lt=max(booking.end_time for booking in bookings),
+                end_time__gt=min(booking.start_time for booking in bookings),
+            ).values_list('room_code_id', 'start_time', 'end_time')
+        )
+
+        unavailable = set()
+        for booking in bookings:
+            overlaps = booking.room_code_id is None or any(
+                room_id == booking.room_code_id and start_time < booking.end_time and end_time > booking.start_time
+                for room_id, start_time, end_time in claimed
+            )
+            if overlaps:
+                unavailable.add(booking.id)
+            else:
+                claimed.append((booking.room_code_id, booking.start_time, booking.end_time))
+        return unavailable
 
     @property
     def original_end_time(self):
@@ -3,6 +3,7 @@ from django.db.models import Q
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 
+from core.throttling import SearchThrottle
 from room.models import Room, RoomBooking
 from room.serializers import RoomSerializer
 
@@ -10,6 +11,7 @@ from room.serializers import RoomSerializer
 # Create your views here.
 class RoomListCreate(ListCreateAPIView):
     serializer_class = RoomSerializer
+    throttle_classes = [SearchThrottle]
 
     def get_queryset(self):
         queryset = Room.objects.all().order_by()
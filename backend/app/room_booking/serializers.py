@@ -3,9 +3,10 @@ from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from booking_audit.log import audit_log, actor_from_request, booking_snapshot
 from customer_detail.models import CustomerDetail
 from customer_detail.serializers import CustomerDetailSerializer
-from room.models import RoomBooking
+from room.models import Room, RoomBooking
 
 class RoomBookingSerializer(serializers.ModelSerializer):
     customer_details = CustomerDetailSerializer(many=True, read_only=True)
@@ -49,6 +50,10 @@ class RoomBookingCreateSerializer(serializers.ModelSerializer):
         if not customer_details:
             raise ValidationError({'customer_details': 'This field must not be empty.'})
 
+        # Same lock as RoomBooking._shift_end_time, so a new booking and an extension
+        # cannot both claim the same window
+        Room.objects.select_for_update().get(pk=validated_data['room_code'].pk)
+
         booking = RoomBooking.objects.create(**validated_data)
 
         if not booking.is_available(validated_data['start_time'], validated_data['end_time']):
@@ -56,6 +61,10 @@ class RoomBookingCreateSerializer(serializers.ModelSerializer):
             raise ValidationError({'error': 'The room is not available for the selected time range.'})
 
         booking.calculate_initial_price()
+        audit_log.record(
+            'created', booking.id, booking_snapshot(booking),
+            actor=actor_from_request(self.context.get('request')),
+        )
 
         CustomerDetail.objects.bulk_create([
             CustomerDetail(room_booking=booking, **customer)
@@ -76,20 +85,35 @@ class RoomBookingUpdateSerializer(serializers.ModelSerializer):
 
         return data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         new_status = validated_data.get('status')
 
         if new_status == 'cancelled' and not instance.can_cancel():
             raise ValidationError({'status': 'Only bookings with status "booked" can be cancelled.'})
 
+        if new_status in RoomBooking.ACTIVE_STATUSES and instance.status not in RoomBooking.ACTIVE_STATUSES:
+            # Reactivating gives the room back to this booking, so re-check it under lock
+            current = RoomBooking.objects.select_for_update().get(pk=instance.pk)
+            if RoomBooking.unavailable_for_reactivation([current]):
+                raise ValidationError({'error': 'The room is no longer available for this booking\'s time range.'})
+
         if new_status and new_status != instance.status:
-            if new_status == 'checked_in':
-                instance.checked_in_at = timezone.now()
-            elif new_status == 'checked_out':
-                instance.checked_out_at = timezone.now()
-            elif new_status == 'cancelled':
-                instance.cancelled_at = timezone.now()
+            old_status = instance.status
+            changed_fields = ['status']
+            timestamp_field = RoomBooking.STATUS_TIMESTAMP_FIELDS.get(new_status)
+            if timestamp_field:
+                setattr(instance, timestamp_field, timezone.now())
+                changed_fields.append(timestamp_field)
             instance.status = new_status
-            instance.save()
+            # Only write the status columns so a stale instance cannot undo an extension
+            instance.save(update_fields=changed_fields)
+            audit_log.record(
+                'status_changed', instance.id, booking_snapshot(instance, changed_fields),
+                actor=actor_from_request(self.context.get('request')), from_status=old_status,
+            )
         return instance
 
+class RoomBookingBatchStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+    status = serializers.ChoiceField(choices=RoomBooking.ROOM_BOOKING_STATUS_CHOICES)
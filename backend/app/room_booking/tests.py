@@ -1,3 +1,133 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from room.models import Room, RoomBooking
+from room_booking.serializers import RoomBookingUpdateSerializer
+
+
+class RoomBookingBatchStatusTests(APITestCase):
+    def setUp(self):
+        self.room = Room.objects.create(code='R101', capacity=2, price_per_hour=Decimal('100.00'))
+        start_time = timezone.now() + timedelta(hours=1)
+        self.booked = self.create_booking('booked', start_time)
+        self.checked_in = self.create_booking('checked_in', start_time + timedelta(hours=3))
+        self.checked_out = self.create_booking('checked_out', start_time + timedelta(hours=6))
+        self.url = reverse('room-booking-batch-status')
+
+    def create_booking(self, booking_status, start_time):
+        return RoomBooking.objects.create(
+            room_code=self.room,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=2),
+            status=booking_status,
+        )
+
+    def results_by_id(self, response):
+        return {result['id']: result for result in response.data['results']}
+
+    def test_check_out_many_bookings(self):
+        response = self.client.post(self.url, {
+            'ids': [self.booked.id, self.checked_in.id, self.checked_out.id, 9999],
+            'status': 'checked_out',
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = self.results_by_id(response)
+        self.assertEqual(results[self.booked.id]['result'], 'updated')
+        self.assertEqual(results[self.checked_in.id]['result'], 'updated')
+        self.assertEqual(results[self.checked_out.id]['result'], 'unchanged')
+        self.assertEqual(results[9999]['result'], 'not_found')
+
+        self.checked_in.refresh_from_db()
+        self.assertEqual(self.checked_in.status, 'checked_out')
+        self.assertIsNotNone(self.checked_in.checked_out_at)
+
+        self.checked_out.refresh_from_db()
+        self.assertIsNone(self.checked_out.checked_out_at)
+
+    def test_cancel_follows_can_cancel_rules(self):
+        response = self.client.post(self.url, {
+            'ids': [self.booked.id, self.checked_in.id],
+            'status': 'cancelled',
+        }, format='json')
+
+        results = self.results_by_id(response)
+        self.assertEqual(results[self.booked.id]['result'], 'updated')
+        self.assertEqual(results[self.checked_in.id]['result'], 'invalid_transition')
+
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.status, 'cancelled')
+        self.assertIsNotNone(self.booked.cancelled_at)
+
+        self.checked_in.refresh_from_db()
+        self.assertEqual(self.checked_in.status, 'checked_in')
+        self.assertIsNone(self.checked_in.cancelled_at)
+
+    def test_reactivation_rechecks_availability(self):
+        start_time = self.booked.start_time
+        # Both overlap the active booking; the second also overlaps the first
+        taken = self.create_booking('cancelled', start_time)
+        first = self.create_booking('cancelled', start_time + timedelta(hours=10))
+        second = self.create_booking('checked_out', start_time + timedelta(hours=11))
+
+        response = self.client.post(self.url, {
+            'ids': [taken.id, first.id, second.id],
+            'status': 'booked',
+        }, format='json')
+
+        results = self.results_by_id(response)
+        self.assertEqual(results[taken.id]['result'], 'unavailable')
+        self.assertEqual(results[first.id]['result'], 'updated')
+        self.assertEqual(results[second.id]['result'], 'unavailable')
+
+        taken.refresh_from_db()
+        self.assertEqual(taken.status, 'cancelled')
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'checked_out')
+
+    def test_invalid_payload(self):
+        response = self.client.post(self.url, {'ids': [], 'status': 'archived'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.data)
+        self.assertIn('status', response.data)
+
+
+class RoomBookingUpdateTests(APITestCase):
+    def test_status_change_on_stale_instance_keeps_extension(self):
+        room = Room.objects.create(code='R101', capacity=2, price_per_hour=Decimal('100.00'))
+        start_time = timezone.now() + timedelta(hours=1)
+        booking = RoomBooking.objects.create(
+            room_code=room, start_time=start_time, end_time=start_time + timedelta(hours=2),
+            total_price=Decimal('200.00'),
+        )
+        stale = RoomBooking.objects.get(pk=booking.pk)
+        booking.extend_booking(1)
+
+        serializer = RoomBookingUpdateSerializer(stale, data={'status': 'checked_in'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'checked_in')
+        self.assertEqual(booking.end_time, start_time + timedelta(hours=3))
+        self.assertEqual(booking.total_price, Decimal('300.00'))
+
+    def test_reactivation_is_rejected_when_room_is_taken(self):
+        room = Room.objects.create(code='R101', capacity=2, price_per_hour=Decimal('100.00'))
+        start_time = timezone.now() + timedelta(hours=1)
+        cancelled = RoomBooking.objects.create(
+            room_code=room, start_time=start_time, end_time=start_time + timedelta(hours=2), status='cancelled',
+        )
+        RoomBooking.objects.create(room_code=room, start_time=start_time, end_time=start_time + timedelta(hours=2))
+
+        response = self.client.patch(reverse('room-booking-update-view', args=[cancelled.id]), {'status': 'booked'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'cancelled')
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from room_booking.views import RoomBookingListCreate, RoomBookingDetailView
+from room_booking.views import RoomBookingListCreate, RoomBookingDetailView, RoomBookingBatchStatusView
 
 urlpatterns = [
     path('', RoomBookingListCreate.as_view(), name='room-booking-list-create'),
     path('<int:pk>/', RoomBookingDetailView.as_view(), name='room-booking-update-view'),
+    path('batch-status/', RoomBookingBatchStatusView.as_view(), name='room-booking-batch-status'),
 ]
\ No newline at end of file
@@ -1,14 +1,19 @@
 # Create your views here.
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateAPIView
+from rest_framework.generics import GenericAPIView, ListCreateAPIView, RetrieveUpdateAPIView
+from rest_framework.response import Response
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 
+from booking_audit.log import actor_from_request
+from core.throttling import BookThrottle
 from room.models import RoomBooking
-from room_booking.serializers import RoomBookingCreateSerializer, RoomBookingUpdateSerializer, RoomBookingSerializer
+from room_booking.serializers import RoomBookingCreateSerializer, RoomBookingUpdateSerializer, RoomBookingSerializer, \
+    RoomBookingBatchStatusSerializer
 
 
 class RoomBookingListCreate(ListCreateAPIView):
     queryset = RoomBooking.objects.all()
+    throttle_classes = [BookThrottle]
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -53,3 +58,18 @@ class RoomBookingDetailView(RetrieveUpdateAPIView):
         if self.request.method in ['PUT', 'PATCH']:
             return RoomBookingUpdateSerializer
         return RoomBookingSerializer
+
+class RoomBookingBatchStatusView(GenericAPIView):
+    serializer_class = RoomBookingBatchStatusSerializer
+    throttle_classes = [BookThrottle]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        new_status = serializer.validated_data['status']
+        results = RoomBooking.bulk_transition(
+            serializer.validated_data['ids'], new_status, actor=actor_from_request(request),
+        )
+
+        return Response({'status': new_status, 'results': results})
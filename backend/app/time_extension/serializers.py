@@ -2,41 +2,30 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 
+from booking_audit.log import actor_from_request
 from room.models import RoomBooking
 from time_extension.models import TimeExtension
 
 
 class TimeExtensionSerializer(serializers.ModelSerializer):
+    duration = serializers.IntegerField(min_value=1, help_text="Duration in hours")
+
     class Meta:
         model = TimeExtension
         fields = '__all__'
-        read_only_fields = ('added_at', 'additional_cost')
+        read_only_fields = ('room_booking', 'added_at', 'additional_cost')
 
     def create(self, validated_data):
         view = self.context.get('view')
         booking = get_object_or_404(RoomBooking, pk=view.kwargs.get('room_booking_pk'))
-        duration = validated_data.pop('duration')
-
-        if booking.status in ['checked_out', 'cancelled']:
-            raise ValidationError({'status': f'Cannot extend a booking that is already {booking.status}'})
-
-        if not duration:
-            raise ValidationError("Minutes must be greater than zero")
-
-        minutes_to_add = duration * 60 # Convert hours to minutes
-        new_extension = booking.extend_booking(minutes_to_add)
 
-        return new_extension
+        return booking.extend_booking(validated_data['duration'], actor=actor_from_request(self.context.get('request')))
 
     def update(self, instance, validated_data):
-        duration = validated_data.get('duration', instance.duration)
-        if duration <= 0:
-            raise ValidationError("Minutes must be greater than zero")
-
-        minutes_to_add = duration * 60 # Convert hours to minutes
-        instance.booking.extend_booking(minutes_to_add)
-
-        instance.duration = duration
-        instance.save()
-        return instance
+        if instance.room_booking is None:
+            raise ValidationError({'room_booking': 'This extension no longer belongs to a booking.'})
 
+        duration = validated_data.get('duration', instance.duration)
+        return instance.room_booking.resize_extension(
+            instance, duration, actor=actor_from_request(self.context.get('request')),
+        )
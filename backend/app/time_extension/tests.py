@@ -1,3 +1,103 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from core.throttling import get_bucket_store
+from room.models import Room, RoomBooking
+from time_extension.models import TimeExtension
+
+
+class TimeExtensionTests(APITestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.room = Room.objects.create(code='R101', capacity=2, price_per_hour=Decimal('100.00'))
+        self.start_time = timezone.now() + timedelta(hours=1)
+        self.booking = self.create_booking(self.start_time, total_price=Decimal('200.00'))
+        self.other_booking = self.create_booking(self.start_time + timedelta(hours=5))
+
+    def create_booking(self, start_time, **kwargs):
+        return RoomBooking.objects.create(
+            room_code=self.room,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=2),
+            **kwargs,
+        )
+
+    def extend(self, booking, hours):
+        url = reverse('time-extension-list-create', args=[booking.id])
+        return self.client.post(url, {'duration': hours}, format='json')
+
+    def test_list_is_scoped_to_booking(self):
+        self.booking.extend_booking(1)
+        self.other_booking.extend_booking(1)
+
+        response = self.client.get(reverse('time-extension-list-create', args=[self.booking.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['room_booking'], self.booking.id)
+
+    def test_extend_updates_end_time_and_total(self):
+        response = self.extend(self.booking, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['additional_cost']), Decimal('200.00'))
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.end_time, self.start_time + timedelta(hours=4))
+        self.assertEqual(self.booking.total_price, Decimal('400.00'))
+        self.assertEqual(self.booking.original_end_time, self.start_time + timedelta(hours=2))
+
+    def test_extend_rejects_overlapping_window(self):
+        response = self.extend(self.booking, 4)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.end_time, self.start_time + timedelta(hours=2))
+        self.assertFalse(TimeExtension.objects.exists())
+
+    def test_extend_booking_only_takes_whole_hours(self):
+        with self.assertRaises(ValidationError):
+            self.booking.extend_booking(1.5)
+
+        extension = self.booking.extend_booking(2)
+        self.assertEqual(extension.duration, 2)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_price, Decimal('200.00') + extension.additional_cost)
+
+    def test_extend_rejects_finished_booking(self):
+        self.booking.status = 'checked_out'
+        self.booking.save()
+
+        response = self.extend(self.booking, 1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data)
+
+    def test_update_resizes_extension(self):
+        extension = self.booking.extend_booking(1)
+
+        response = self.client.patch(reverse('time-extension-detail', args=[extension.id]), {'duration': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['duration'], 3)
+        self.assertEqual(Decimal(response.data['additional_cost']), Decimal('300.00'))
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.end_time, self.start_time + timedelta(hours=5))
+        self.assertEqual(self.booking.total_price, Decimal('500.00'))
+
+    def test_resize_from_stale_copy_uses_locked_row(self):
+        extension = self.booking.extend_booking(1)
+        first_copy = TimeExtension.objects.get(pk=extension.pk)
+        second_copy = TimeExtension.objects.get(pk=extension.pk)
+
+        self.booking.resize_extension(first_copy, 3)
+        resized = self.booking.resize_extension(second_copy, 3)
+        self.assertEqual(resized.duration, 3)
+        self.assertEqual(resized.additional_cost, Decimal('300.00'))
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.end_time, self.start_time + timedelta(hours=5))
+        self.assertEqual(self.booking.total_price, Decimal('500.00'))
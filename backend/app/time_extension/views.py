@@ -1,15 +1,20 @@
 # Create your views here.
-from rest_framework.generics import ListAPIView, RetrieveUpdateAPIView, ListCreateAPIView
+from rest_framework.generics import RetrieveUpdateAPIView, ListCreateAPIView
 
+from core.throttling import ExtendThrottle
 from time_extension.models import TimeExtension
 from time_extension.serializers import TimeExtensionSerializer
 
 
 class TimeExtensionListCreate(ListCreateAPIView):
-    queryset = TimeExtension.objects.all()
     serializer_class = TimeExtensionSerializer
+    throttle_classes = [ExtendThrottle]
+
+    def get_queryset(self):
+        return TimeExtension.objects.filter(room_booking_id=self.kwargs['room_booking_pk']).order_by('-added_at')
 
 class TimeExtensionDetailView(RetrieveUpdateAPIView):
-    queryset = TimeExtension.objects.all()
+    queryset = TimeExtension.objects.select_related('room_booking')
     serializer_class = TimeExtensionSerializer
-    lookup_field = 'roomBooking'
\ No newline at end of file
+    throttle_classes = [ExtendThrottle]
+    lookup_field = 'pk'